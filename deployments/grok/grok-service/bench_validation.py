@@ -0,0 +1,36 @@
+"""
+Benchmark scalar against vectorized anomaly validation
+
+Used to pick VECTORIZE_THRESHOLD in main.py. Run from this directory with:
+python bench_validation.py
+"""
+
+import timeit
+
+import main
+
+SIZES = (8, 32, 128, 256, 384, 512, 1024, 4096, 10000)
+NAMES = list(main._TYPE_MAP) + ["unknown"]
+
+
+def _time(func) -> float:
+    """Best per-call time in microseconds"""
+    return min(timeit.repeat(func, number=200, repeat=5)) / 200 * 1e6
+
+
+def main_bench():
+    analyzer = main.LightweightAnalyzer()
+    print(f"{'size':>6} {'scalar us':>10} {'numpy us':>10}")
+    for size in SIZES:
+        scores = [float(i % 101) for i in range(size)]
+        type_ids = [main._TYPE_IDS.get(NAMES[i % len(NAMES)], main._UNKNOWN_TYPE_ID) for i in range(size)]
+
+        main.VECTORIZE_THRESHOLD = size
+        scalar = _time(lambda: analyzer._validate_anomalies(scores, type_ids))
+        main.VECTORIZE_THRESHOLD = -1
+        vectorized = _time(lambda: analyzer._validate_anomalies(scores, type_ids))
+        print(f"{size:>6} {scalar:>10.1f} {vectorized:>10.1f}")
+
+
+if __name__ == "__main__":
+    main_bench()
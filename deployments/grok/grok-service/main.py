@@ -12,39 +12,93 @@ import os
 import json
 import logging
 import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel, Field
+from enum import IntEnum
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, List, Optional, Any, Tuple, Union
+import numpy as np
+import orjson
+import xxhash
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 import uvicorn
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+class _JSONFormatter(logging.Formatter):
+    """Format log records as one JSON object per line, with an epoch timestamp instead of strftime"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(_JSONFormatter())
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
 logger = logging.getLogger(__name__)
 
 # Configuration
 MODE = os.getenv("GROK_MODE", "lightweight")  # lightweight, full, proxy
 GROK_API_URL = os.getenv("GROK_API_URL", "")
 MODEL_PATH = os.getenv("MODEL_PATH", "/models")
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "16"))
+MAX_LATENCY_MS = float(os.getenv("MAX_LATENCY_MS", "20"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+STREAM_THRESHOLD = int(os.getenv("STREAM_THRESHOLD", "256"))
+STREAM_CHUNK_SIZE = 64
+# Anomaly lists up to this size are validated in plain Python, where NumPy setup costs more.
+# Re-check the crossover with bench_validation.py when the validation rules change.
+VECTORIZE_THRESHOLD = 384
+ANALYZER_PROCESSES = int(os.getenv("ANALYZER_PROCESSES", "0"))
+ANALYZER_JIT = os.getenv("ANALYZER_JIT", "false").lower() == "true"
 
 # FastAPI app
 app = FastAPI(
     title="Grok-1 Inference Service",
     description="AI-powered traffic analysis for Odin API Gateway",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Request/Response models
+class Anomaly(BaseModel):
+    model_config = ConfigDict(defer_build=True, extra="allow")
+    
+    anomaly_type: str = ""
+    severity: str = ""
+    score: float = 0
+
+class AnalysisContext(BaseModel):
+    """Schema of the request context as read by the lightweight analyzer"""
+    model_config = ConfigDict(defer_build=True, extra="allow")
+    
+    anomalies: Optional[List[Anomaly]] = None
+
 class AnalysisRequest(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+    
     prompt: str
     max_tokens: Optional[int] = Field(default=500, ge=1, le=2000)
     temperature: Optional[float] = Field(default=0.3, ge=0.0, le=1.0)
+    # Kept as received so proxy mode and the response cache see the client's JSON
     context: Optional[Dict[str, Any]] = None
 
 class AnalysisResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+    
     response: str
     confidence: Optional[float] = None
     anomalies: Optional[List[str]] = None
@@ -52,6 +106,8 @@ class AnalysisResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 class HealthResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True, protected_namespaces=())
+    
     status: str
     mode: str
     model_loaded: bool
@@ -59,40 +115,140 @@ class HealthResponse(BaseModel):
 
 # Global state
 model = None
-start_time = datetime.now()
+start_time = time.monotonic()
+batch_queue: Optional[asyncio.Queue] = None
+batch_task: Optional[asyncio.Task] = None
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+# Static part of the readiness response, updated once the model is loaded
+health_info: Dict[str, Any] = {"status": "unhealthy", "mode": MODE, "model_loaded": False}
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the model on startup"""
-    global model
+    global model, batch_queue, batch_task, health_info, _classify_scores
     logger.info(f"Starting Grok inference service in {MODE} mode")
     
     try:
-        if MODE == "lightweight":
-            model = LightweightAnalyzer()
-            logger.info("Lightweight analyzer initialized")
-        elif MODE == "full":
-            model = GrokAnalyzer(MODEL_PATH)
-            logger.info("Grok-1 model initialized")
-        elif MODE == "proxy":
-            model = ProxyAnalyzer(GROK_API_URL)
-            logger.info(f"Proxy analyzer initialized (API: {GROK_API_URL})")
-        else:
+        if MODE not in _MODE_CLASSES:
             raise ValueError(f"Unknown mode: {MODE}")
+        cls, args = _MODE_CLASSES[MODE]
+        model = cls(*args)
+        logger.info(f"{cls.__name__} initialized")
+        # Compile before serving so the first request does not block the loop
+        if ANALYZER_JIT:
+            _classify_scores = _load_jit_classifier()
+        health_info = {"status": "healthy", "mode": MODE, "model_loaded": True}
     except Exception as e:
         logger.error(f"Failed to initialize model: {e}")
         raise
+    
+    if model.batches:
+        batch_queue = asyncio.Queue()
+        batch_task = asyncio.create_task(batch_worker())
+        logger.info(f"Batching enabled (max size: {MAX_BATCH_SIZE}, max latency: {MAX_LATENCY_MS}ms)")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batch worker and release model resources on shutdown"""
+    if batch_task:
+        batch_task.cancel()
+    if isinstance(model, (LightweightAnalyzer, ProxyAnalyzer)):
+        await model.close()
+
+def _render(result: Union[AnalysisResponse, Response]):
+    """Stream responses with large anomaly lists, return the rest as-is"""
+    if isinstance(result, Response):
+        return result
+    if result.anomalies and len(result.anomalies) > STREAM_THRESHOLD:
+        return StreamingResponse(_stream_response(result), media_type="application/json")
+    return result
+
+async def _stream_response(result: AnalysisResponse):
+    """Yield the JSON encoding of an analysis response in chunks"""
+    yield orjson.dumps({"response": result.response, "confidence": result.confidence})[:-1]
+    
+    for field in ("anomalies", "suggestions"):
+        items = getattr(result, field)
+        if items is None:
+            yield f',"{field}":null'.encode()
+            continue
+        
+        yield f',"{field}":['.encode()
+        for i in range(0, len(items), STREAM_CHUNK_SIZE):
+            chunk = orjson.dumps(items[i:i + STREAM_CHUNK_SIZE])[1:-1]
+            yield chunk if i == 0 else b"," + chunk
+        yield b"]"
+    
+    yield b',"metadata":' + orjson.dumps(result.metadata) + b"}"
+
+def _cache_key(request: AnalysisRequest) -> int:
+    """Hash the parts of a request that determine its response"""
+    digest = xxhash.xxh3_64(request.prompt.encode())
+    digest.update(orjson.dumps(request.context, option=orjson.OPT_SORT_KEYS))
+    digest.update(str(request.max_tokens).encode())
+    return digest.intdigest()
+
+async def batch_worker():
+    """
+    Drain queued analysis requests in micro-batches
+    A batch is flushed as soon as no more requests are waiting, once
+    MAX_BATCH_SIZE requests are queued, or once MAX_LATENCY_MS has passed
+    since the first request arrived
+    """
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        batch = [await batch_queue.get()]
+        deadline = loop.time() + MAX_LATENCY_MS / 1000
+        
+        while len(batch) < MAX_BATCH_SIZE:
+            try:
+                batch.append(batch_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            if loop.time() >= deadline:
+                break
+            # Give handlers that are already running a chance to enqueue
+            await asyncio.sleep(0)
+            if batch_queue.empty():
+                break
+        
+        requests = [request for request, _ in batch]
+        try:
+            results = await model.analyze_batch(
+                [r.prompt for r in requests],
+                [r.max_tokens for r in requests],
+                [r.temperature for r in requests],
+                [r.context for r in requests]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        
+        # Analyzers return an exception in place of a response for requests that failed alone
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+# Liveness response built once and sent as-is on every probe
+_LIVEZ_RESPONSE = PlainTextResponse("ok")
+
+@app.get("/livez", response_class=PlainTextResponse)
+async def liveness_check():
+    """Liveness probe endpoint"""
+    return _LIVEZ_RESPONSE
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    uptime = (datetime.now() - start_time).total_seconds()
-    return HealthResponse(
-        status="healthy" if model else "unhealthy",
-        mode=MODE,
-        model_loaded=model is not None,
-        uptime=uptime
-    )
+    """Readiness check endpoint"""
+    return ORJSONResponse(content=health_info | {"uptime": time.monotonic() - start_time})
 
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze(request: AnalysisRequest):
@@ -100,28 +256,167 @@ async def analyze(request: AnalysisRequest):
     if not model:
         raise HTTPException(status_code=503, detail="Model not initialized")
     
+    # Only deterministic requests are served from the response cache
+    cache_key = None
+    if request.temperature == 0:
+        try:
+            cache_key = _cache_key(request)
+        except TypeError as e:
+            # orjson cannot encode every JSON value (e.g. integers beyond 64 bits)
+            logger.warning(f"Skipping response cache for request: {e}")
+        else:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return _render(cached)
+    
     try:
-        logger.info(f"Analyzing request with prompt length: {len(request.prompt)}")
-        result = await model.analyze(
-            request.prompt,
-            request.max_tokens,
-            request.temperature,
-            request.context
-        )
-        return result
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Analyzing request with prompt length: {len(request.prompt)}")
+        if model.passthrough:
+            # Pass the upstream JSON through without decoding and re-encoding it
+            result = await model.analyze_raw(
+                request.prompt,
+                request.max_tokens,
+                request.temperature,
+                request.context
+            )
+        elif model.batches:
+            future = asyncio.get_running_loop().create_future()
+            await batch_queue.put((request, future))
+            result = await future
+        else:
+            result = await model.analyze(
+                request.prompt,
+                request.max_tokens,
+                request.temperature,
+                request.context
+            )
+        if cache_key is not None:
+            response_cache[cache_key] = result
+        return _render(result)
+    except HTTPException:
+        # Upstream and context validation errors already carry their status and detail
+        raise
     except Exception as e:
         logger.error(f"Analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+class AnomalyType(IntEnum):
+    """Known anomaly types, interned to small integers at ingress"""
+    ERROR_SPIKE = 0
+    LATENCY_SPIKE = 1
+    DDOS_ATTACK = 2
+    DATA_EXFIL = 3
+    TRAFFIC_SPIKE = 4
+    UNKNOWN = 5
+
+_TYPE_MAP: Dict[str, AnomalyType] = {
+    "error_spike": AnomalyType.ERROR_SPIKE,
+    "latency_spike": AnomalyType.LATENCY_SPIKE,
+    "ddos_attack": AnomalyType.DDOS_ATTACK,
+    "data_exfiltration": AnomalyType.DATA_EXFIL,
+    "traffic_spike": AnomalyType.TRAFFIC_SPIKE
+}
+
+# Plain int IDs per type name, since NumPy converts IntEnum members one by one in Python
+_TYPE_IDS: Dict[str, int] = {name: int(anomaly_type) for name, anomaly_type in _TYPE_MAP.items()}
+_UNKNOWN_TYPE_ID = int(AnomalyType.UNKNOWN)
+
+# Remediation suggestions per anomaly type, built once at import
+_SUGGESTIONS_MAP: Dict[AnomalyType, Tuple[str, ...]] = {
+    AnomalyType.ERROR_SPIKE: (
+        "Check backend service health",
+        "Review recent deployments",
+        "Increase timeout values if needed"
+    ),
+    AnomalyType.LATENCY_SPIKE: (
+        "Scale up backend instances",
+        "Check database query performance",
+        "Enable caching for frequently accessed resources"
+    ),
+    AnomalyType.DDOS_ATTACK: (
+        "Enable rate limiting immediately",
+        "Block suspicious IP ranges",
+        "Contact DDoS mitigation provider"
+    ),
+    AnomalyType.TRAFFIC_SPIKE: (
+        "Verify if legitimate traffic increase",
+        "Scale horizontally if needed",
+        "Enable CDN caching"
+    )
+}
+_DEFAULT_SUGGESTIONS: Tuple[str, ...] = ("Monitor the situation closely",)
+
+# Suggestions indexed directly by AnomalyType value, so lookups need no hashing
+_SUGGESTIONS_TABLE: Tuple[Tuple[str, ...], ...] = tuple(
+    _SUGGESTIONS_MAP.get(anomaly_type, _DEFAULT_SUGGESTIONS)
+    for anomaly_type in AnomalyType
+)
+
+_HIGH_RISK_TYPES = frozenset((int(AnomalyType.DDOS_ATTACK), int(AnomalyType.DATA_EXFIL)))
+
+def _classify_scores_numpy(scores: np.ndarray, type_ids: np.ndarray) -> np.ndarray:
+    """Validate anomaly scores against the rules using NumPy masks"""
+    high_risk = (type_ids == AnomalyType.DDOS_ATTACK) | (type_ids == AnomalyType.DATA_EXFIL)
+    return (scores > 80) | ((scores > 60) & high_risk)
+
+def _classify_scores_loop(scores: np.ndarray, type_ids: np.ndarray) -> np.ndarray:
+    """Validate anomaly scores against the rules in an explicit loop, compiled by Numba"""
+    valid = np.empty(scores.shape[0], dtype=np.bool_)
+    for i in range(scores.shape[0]):
+        high_risk = (
+            type_ids[i] == AnomalyType.DDOS_ATTACK
+            or type_ids[i] == AnomalyType.DATA_EXFIL
+        )
+        valid[i] = scores[i] > 80 or (scores[i] > 60 and high_risk)
+    return valid
+
+def _load_jit_classifier():
+    """Compile the Numba classifier, falling back to NumPy if that fails"""
+    try:
+        import numba
+        kernel = numba.njit(cache=True)(_classify_scores_loop)
+        kernel(np.zeros(1, dtype=np.float64), np.zeros(1, dtype=np.int8))
+    except Exception as e:
+        logger.warning(f"Numba classifier unavailable, using NumPy: {e}")
+        return _classify_scores_numpy
+    
+    logger.info("Numba classifier compiled")
+    return kernel
+
+# Replaced by the Numba kernel at startup when ANALYZER_JIT is enabled
+_classify_scores = _classify_scores_numpy
+
+@lru_cache(maxsize=1)
+def _analyzed_at(second: int) -> str:
+    """Format an analysis timestamp, reused for all requests within a second"""
+    return datetime.fromtimestamp(second).isoformat()
+
 class LightweightAnalyzer:
     """
     Lightweight analyzer using rule-based and simple ML approaches
     This is the default mode for production use without expensive GPU requirements
     """
     
-    def __init__(self):
+    # Requests are only worth queueing into batches when a worker pool is configured
+    batches = False
+    passthrough = False
+    
+    def __init__(self, processes: int = 0):
         logger.info("Initializing lightweight analyzer")
         self.rules = self._load_rules()
+        # Batches are analyzed in worker processes when a pool size is configured
+        self._processes = processes
+        self._executor = None
+        if processes > 0:
+            self._executor = ProcessPoolExecutor(max_workers=processes)
+            self.batches = True
+            logger.info(f"Batch analysis uses {processes} worker processes")
+    
+    async def close(self):
+        """Shut down the batch worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
     
     def _load_rules(self) -> Dict[str, Any]:
         """Load anomaly detection rules"""
@@ -148,34 +443,130 @@ class LightweightAnalyzer:
         context: Optional[Dict[str, Any]]
     ) -> AnalysisResponse:
         """Perform lightweight analysis"""
-        logger.info("Performing lightweight analysis")
+        logger.debug("Performing lightweight analysis")
         
-        # Parse context if available
+        result = self._analyze_anomalies(prompt, *self._extract_anomalies(context))
+        return self._build_response(*result)
+    
+    async def analyze_batch(
+        self,
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+        contexts: List[Optional[Dict[str, Any]]]
+    ) -> List[Union[AnalysisResponse, HTTPException]]:
+        """
+        Perform lightweight analysis over a batch of requests
+        Requests with an invalid context get an HTTPException in place of their response
+        """
+        extracted = []
+        for prompt, context in zip(prompts, contexts):
+            try:
+                extracted.append((prompt, *self._extract_anomalies(context)))
+            except HTTPException as e:
+                extracted.append(e)
+        inputs = [item for item in extracted if not isinstance(item, HTTPException)]
+        
+        if self._executor is None:
+            results = [self._analyze_anomalies(*item) for item in inputs]
+        else:
+            results = await self._run_in_pool(inputs)
+        
+        results = iter(results)
+        return [
+            item if isinstance(item, HTTPException) else self._build_response(*next(results))
+            for item in extracted
+        ]
+    
+    async def _run_in_pool(
+        self,
+        inputs: List[Tuple[str, List[str], List[str], List[float]]]
+    ) -> List[Tuple[str, List[str], List[str], float]]:
+        """Analyze a batch in the worker pool, replacing the pool if a worker died"""
+        executor = self._executor
+        try:
+            # Only plain lists cross the process boundary
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, _batch_classify, inputs
+            )
+        except BrokenProcessPool:
+            # A dead worker (e.g. OOM-killed) would otherwise fail every later batch
+            if self._executor is executor:
+                logger.error("Batch worker process died, restarting the pool")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = ProcessPoolExecutor(max_workers=self._processes)
+            raise HTTPException(status_code=503, detail="Analyzer worker process died")
+    
+    def _extract_anomalies(
+        self,
+        context: Optional[Dict[str, Any]]
+    ) -> Tuple[List[str], List[str], List[float]]:
+        """Parse the context anomalies and split them into type, severity and score lists"""
+        if not context:
+            return [], [], []
+        
+        try:
+            detected_anomalies = AnalysisContext.model_validate(context).anomalies
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=[
+                {**error, "loc": ("body", "context", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ])
+        if not detected_anomalies:
+            return [], [], []
+        
+        return (
+            [a.anomaly_type for a in detected_anomalies],
+            [a.severity for a in detected_anomalies],
+            [a.score for a in detected_anomalies]
+        )
+    
+    def _analyze_anomalies(
+        self,
+        prompt: str,
+        types: List[str],
+        severities: List[str],
+        scores: List[float]
+    ) -> Tuple[str, List[str], List[str], float]:
+        """Validate anomalies and build the response text, anomalies, suggestions and confidence"""
         anomalies = []
         suggestions = []
         confidence = 0.7
         
-        if context and "anomalies" in context:
-            detected_anomalies = context["anomalies"]
+        if types:
+            type_ids = [_TYPE_IDS.get(t, _UNKNOWN_TYPE_ID) for t in types]
+            
+            # Validate all anomalies based on rules in one pass
+            valid = self._validate_anomalies(scores, type_ids)
             
-            for anomaly in detected_anomalies:
-                anomaly_type = anomaly.get("anomaly_type", "")
-                severity = anomaly.get("severity", "")
-                
-                # Validate anomaly based on rules
-                if self._validate_anomaly(anomaly):
-                    anomalies.append(f"Confirmed: {anomaly_type} - {severity}")
-                    confidence = 0.85
-                else:
-                    anomalies.append(f"Low confidence: {anomaly_type}")
-                    confidence = 0.5
-                
-                # Generate suggestions
-                suggestions.extend(self._generate_suggestions(anomaly_type, severity))
+            anomalies = [
+                f"Confirmed: {anomaly_type} - {severity}" if is_valid
+                else f"Low confidence: {anomaly_type}"
+                for anomaly_type, severity, is_valid
+                in zip(types, severities, valid)
+            ]
+            
+            # Generate suggestions
+            suggestions = list(chain.from_iterable(
+                map(self._generate_suggestions, type_ids, severities)
+            ))
+            
+            # Confidence follows the most recent anomaly
+            confidence = 0.85 if valid[-1] else 0.5
         
         # Generate response text
         response_text = self._generate_response(prompt, anomalies, suggestions)
         
+        return response_text, anomalies, suggestions, confidence
+    
+    def _build_response(
+        self,
+        response_text: str,
+        anomalies: List[str],
+        suggestions: List[str],
+        confidence: float
+    ) -> AnalysisResponse:
+        """Wrap analysis results in a response"""
         return AnalysisResponse(
             response=response_text,
             confidence=confidence,
@@ -184,49 +575,27 @@ class LightweightAnalyzer:
             metadata={
                 "analyzer": "lightweight",
                 "rules_version": "1.0",
-                "analyzed_at": datetime.now().isoformat()
+                "analyzed_at": _analyzed_at(int(time.time()))
             }
         )
     
-    def _validate_anomaly(self, anomaly: Dict[str, Any]) -> bool:
-        """Validate if the detected anomaly is likely real"""
-        score = anomaly.get("score", 0)
-        anomaly_type = anomaly.get("anomaly_type", "")
-        
+    def _validate_anomalies(self, scores: List[float], type_ids: List[int]) -> List[bool]:
+        """Validate which detected anomalies are likely real"""
         # Simple validation based on score and type
-        if score > 80:
-            return True
-        if score > 60 and anomaly_type in ["ddos_attack", "data_exfiltration"]:
-            return True
+        if len(scores) <= VECTORIZE_THRESHOLD:
+            return [
+                score > 80 or (score > 60 and type_id in _HIGH_RISK_TYPES)
+                for score, type_id in zip(scores, type_ids)
+            ]
         
-        return False
+        return _classify_scores(
+            np.array(scores, dtype=np.float64),
+            np.array(type_ids, dtype=np.int8)
+        ).tolist()
     
-    def _generate_suggestions(self, anomaly_type: str, severity: str) -> List[str]:
+    def _generate_suggestions(self, anomaly_type: int, severity: str) -> Tuple[str, ...]:
         """Generate remediation suggestions"""
-        suggestions_map = {
-            "error_spike": [
-                "Check backend service health",
-                "Review recent deployments",
-                "Increase timeout values if needed"
-            ],
-            "latency_spike": [
-                "Scale up backend instances",
-                "Check database query performance",
-                "Enable caching for frequently accessed resources"
-            ],
-            "ddos_attack": [
-                "Enable rate limiting immediately",
-                "Block suspicious IP ranges",
-                "Contact DDoS mitigation provider"
-            ],
-            "traffic_spike": [
-                "Verify if legitimate traffic increase",
-                "Scale horizontally if needed",
-                "Enable CDN caching"
-            ]
-        }
-        
-        return suggestions_map.get(anomaly_type, ["Monitor the situation closely"])
+        return _SUGGESTIONS_TABLE[anomaly_type]
     
     def _generate_response(
         self,
@@ -238,17 +607,26 @@ class LightweightAnalyzer:
         if not anomalies:
             return "No significant anomalies detected in the analyzed traffic patterns. All metrics appear to be within normal ranges."
         
-        response = f"Analysis Results:\n\n"
-        response += f"Detected {len(anomalies)} anomalies:\n"
-        for i, anomaly in enumerate(anomalies, 1):
-            response += f"{i}. {anomaly}\n"
+        parts = ["Analysis Results:\n\nDetected ", str(len(anomalies)), " anomalies:\n"]
+        parts.extend(f"{i}. {anomaly}\n" for i, anomaly in enumerate(anomalies, 1))
         
         if suggestions:
-            response += f"\nRecommended Actions:\n"
-            for i, suggestion in enumerate(suggestions, 1):
-                response += f"{i}. {suggestion}\n"
+            parts.append("\nRecommended Actions:\n")
+            parts.extend(f"{i}. {suggestion}\n" for i, suggestion in enumerate(suggestions, 1))
         
-        return response
+        return "".join(parts)
+
+@lru_cache(maxsize=1)
+def _worker_analyzer() -> LightweightAnalyzer:
+    """Analyzer instance reused by each batch worker process"""
+    return LightweightAnalyzer()
+
+def _batch_classify(
+    inputs: List[Tuple[str, List[str], List[str], List[float]]]
+) -> List[Tuple[str, List[str], List[str], float]]:
+    """Analyze serialized requests in a batch worker process"""
+    analyzer = _worker_analyzer()
+    return [analyzer._analyze_anomalies(*item) for item in inputs]
 
 class GrokAnalyzer:
     """
@@ -256,6 +634,9 @@ class GrokAnalyzer:
     This would load and run the actual Grok-1 model
     """
     
+    batches = False
+    passthrough = False
+    
     def __init__(self, model_path: str):
         logger.warning("Full Grok-1 mode requires significant GPU memory")
         logger.warning("This implementation is a placeholder")
@@ -267,7 +648,10 @@ class GrokAnalyzer:
             "Use 'lightweight' or 'proxy' mode instead."
         )
     
-    async def analyze(self, prompt: str, max_tokens: int, temperature: float, context: Optional[Dict]) -> AnalysisResponse:
+    async def analyze(self, prompt: str, max_tokens: int, temperature: float, context: Optional[Dict[str, Any]]) -> AnalysisResponse:
+        raise NotImplementedError()
+    
+    async def analyze_batch(self, prompts: List[str], max_tokens: List[int], temperatures: List[float], contexts: List[Optional[Dict[str, Any]]]) -> List[AnalysisResponse]:
         raise NotImplementedError()
 
 class ProxyAnalyzer:
@@ -275,12 +659,70 @@ class ProxyAnalyzer:
     Proxy analyzer that forwards requests to external Grok API
     """
     
+    batches = False
+    # Upstream responses are returned as raw bytes through analyze_raw
+    passthrough = True
+    # Deadline for a whole upstream request, on top of httpx's per-phase timeouts
+    timeout = 60.0
+    
     def __init__(self, api_url: str):
         if not api_url:
             raise ValueError("GROK_API_URL must be set for proxy mode")
         self.api_url = api_url
+        self._client = None
         logger.info(f"Proxy mode configured for: {api_url}")
     
+    def _get_client(self):
+        """Create the shared HTTP/2 client on first use"""
+        import httpx
+        
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=50,
+                    keepalive_expiry=60
+                ),
+                timeout=httpx.Timeout(self.timeout),
+                headers={
+                    "Content-Type": "application/json",
+                    "Accept-Encoding": "gzip, br"
+                }
+            )
+        return self._client
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+    
+    async def _post(self, path: str, payload: Dict[str, Any]):
+        """POST a JSON payload upstream and return the successful response"""
+        try:
+            content = orjson.dumps(payload)
+        except TypeError:
+            # orjson rejects some valid JSON values (e.g. integers beyond 64 bits)
+            content = json.dumps(payload).encode()
+        
+        try:
+            response = await asyncio.wait_for(
+                self._get_client().post(f"{self.api_url}{path}", content=content),
+                self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504,
+                detail=f"Grok API timed out after {self.timeout:g}s"
+            )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Grok API error: {response.text}"
+            )
+        return response
+    
     async def analyze(
         self,
         prompt: str,
@@ -289,8 +731,25 @@ class ProxyAnalyzer:
         context: Optional[Dict[str, Any]]
     ) -> AnalysisResponse:
         """Forward request to external Grok API"""
-        import aiohttp
+        payload = {
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "context": context
+        }
         
+        response = await self._post("/analyze", payload)
+        data = orjson.loads(response.content)
+        return AnalysisResponse(**data)
+    
+    async def analyze_raw(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        context: Optional[Dict[str, Any]]
+    ) -> Response:
+        """Forward request to external Grok API and return its body untouched"""
         payload = {
             "prompt": prompt,
             "max_tokens": max_tokens,
@@ -298,26 +757,49 @@ class ProxyAnalyzer:
             "context": context
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.api_url}/analyze",
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Grok API error: {await response.text()}"
-                    )
-                
-                data = await response.json()
-                return AnalysisResponse(**data)
+        response = await self._post("/analyze", payload)
+        return Response(
+            content=response.content,
+            media_type="application/json",
+            status_code=response.status_code
+        )
+    
+    async def analyze_batch(
+        self,
+        prompts: List[str],
+        max_tokens: List[int],
+        temperatures: List[float],
+        contexts: List[Optional[Dict[str, Any]]]
+    ) -> List[AnalysisResponse]:
+        """Forward a batch of requests to external Grok API concurrently"""
+        return list(await asyncio.gather(*(
+            self.analyze(prompt, tokens, temperature, context)
+            for prompt, tokens, temperature, context
+            in zip(prompts, max_tokens, temperatures, contexts)
+        )))
+
+# Analyzer class and constructor arguments per operating mode
+_MODE_CLASSES = {
+    "lightweight": (LightweightAnalyzer, (ANALYZER_PROCESSES,)),
+    "full": (GrokAnalyzer, (MODEL_PATH,)),
+    "proxy": (ProxyAnalyzer, (GROK_API_URL,))
+}
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
+    # Full mode holds the model in process memory, so it must not be replicated.
+    # os.cpu_count() reports host CPUs rather than the container quota, so
+    # scaling past one worker is opt-in through WEB_CONCURRENCY.
+    workers = 1
+    if MODE in ("lightweight", "proxy"):
+        workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # The app is passed as an import string so uvicorn can spawn workers
     uvicorn.run(
-        app,
+        "main:app",
         host="0.0.0.0",
         port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     )
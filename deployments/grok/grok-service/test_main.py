@@ -0,0 +1,348 @@
+"""
+Tests for the Grok inference service
+
+Run from this directory with: python -m pytest
+"""
+
+import asyncio
+import json
+
+import httpx
+import orjson
+import pytest
+from fastapi.responses import StreamingResponse
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+
+import main
+
+
+async def _collect(result: main.AnalysisResponse) -> bytes:
+    return b"".join([chunk async for chunk in main._stream_response(result)])
+
+
+@pytest.mark.parametrize("result", [
+    main.AnalysisResponse(
+        response="Analysis Results:\n\"quoted\" é",
+        confidence=0.85,
+        anomalies=[f"Confirmed: error_spike - {i}" for i in range(300)],
+        suggestions=[f"Suggestion {i}" for i in range(130)],
+        metadata={"analyzer": "lightweight", "rules_version": "1.0"}
+    ),
+    main.AnalysisResponse(
+        response="text",
+        anomalies=[f"Low confidence: {i}" for i in range(64)],
+        suggestions=None
+    ),
+    main.AnalysisResponse(response="text", anomalies=None, suggestions=["only one"]),
+    main.AnalysisResponse(response="", anomalies=[], suggestions=[]),
+])
+def test_stream_response_matches_model_dump(result):
+    body = asyncio.run(_collect(result))
+    assert orjson.loads(body) == result.model_dump()
+
+
+def test_render_streams_only_large_anomaly_lists():
+    small = main.AnalysisResponse(response="a", anomalies=["x"] * main.STREAM_THRESHOLD)
+    large = main.AnalysisResponse(response="a", anomalies=["x"] * (main.STREAM_THRESHOLD + 1))
+    assert main._render(small) is small
+    assert isinstance(main._render(large), StreamingResponse)
+
+
+def test_livez_reuses_static_response():
+    client = TestClient(main.app)
+    for _ in range(2):
+        response = client.get("/livez")
+        assert response.status_code == 200
+        assert response.text == "ok"
+        assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_health_merges_uptime_into_status(monkeypatch):
+    monkeypatch.setattr(main, "health_info", {"status": "healthy", "mode": "lightweight", "model_loaded": True})
+    monkeypatch.setattr(main, "start_time", main.time.monotonic() - 5)
+
+    body = TestClient(main.app).get("/health").json()
+    assert body.pop("uptime") >= 5
+    assert body == {"status": "healthy", "mode": "lightweight", "model_loaded": True}
+    assert "uptime" not in main.health_info
+
+
+class _RecordingAnalyzer:
+    """Analyzer stub that records each batch it receives"""
+
+    batches = True
+    passthrough = False
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.calls = []
+
+    async def analyze_batch(self, prompts, max_tokens, temperatures, contexts):
+        self.calls.append(list(prompts))
+        if self.error:
+            raise self.error
+        return [main.AnalysisResponse(response=prompt) for prompt in prompts]
+
+
+async def _run_batch_worker(monkeypatch, analyzer, prompts, cancel=()):
+    monkeypatch.setattr(main, "model", analyzer)
+    monkeypatch.setattr(main, "batch_queue", asyncio.Queue())
+    loop = asyncio.get_running_loop()
+
+    futures = []
+    for prompt in prompts:
+        future = loop.create_future()
+        if prompt in cancel:
+            future.cancel()
+        futures.append(future)
+        main.batch_queue.put_nowait((main.AnalysisRequest(prompt=prompt), future))
+
+    worker = asyncio.create_task(main.batch_worker())
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*futures, return_exceptions=True),
+            timeout=1
+        )
+    finally:
+        worker.cancel()
+    return futures
+
+
+def test_batch_worker_fans_out_results_in_order(monkeypatch):
+    analyzer = _RecordingAnalyzer()
+    prompts = [f"p{i}" for i in range(5)]
+    futures = asyncio.run(_run_batch_worker(monkeypatch, analyzer, prompts))
+
+    assert analyzer.calls == [prompts]
+    assert [f.result().response for f in futures] == prompts
+
+
+def test_batch_worker_splits_at_max_batch_size(monkeypatch):
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 2)
+    analyzer = _RecordingAnalyzer()
+    prompts = ["a", "b", "c"]
+    futures = asyncio.run(_run_batch_worker(monkeypatch, analyzer, prompts))
+
+    assert analyzer.calls == [["a", "b"], ["c"]]
+    assert [f.result().response for f in futures] == prompts
+
+
+def test_batch_worker_flushes_without_waiting_for_deadline(monkeypatch):
+    # A one-hour window would time the test out if the worker waited for it
+    monkeypatch.setattr(main, "MAX_LATENCY_MS", 3_600_000)
+    analyzer = _RecordingAnalyzer()
+    futures = asyncio.run(_run_batch_worker(monkeypatch, analyzer, ["only"]))
+
+    assert futures[0].result().response == "only"
+
+
+def test_batch_worker_propagates_errors_to_every_request(monkeypatch):
+    error = RuntimeError("analyzer failed")
+    analyzer = _RecordingAnalyzer(error=error)
+    futures = asyncio.run(_run_batch_worker(monkeypatch, analyzer, ["a", "b"]))
+
+    assert [f.exception() for f in futures] == [error, error]
+
+
+def test_batch_worker_skips_cancelled_requests(monkeypatch):
+    analyzer = _RecordingAnalyzer()
+    futures = asyncio.run(
+        _run_batch_worker(monkeypatch, analyzer, ["a", "b"], cancel=("a",))
+    )
+
+    assert futures[0].cancelled()
+    assert futures[1].result().response == "b"
+
+
+class _CountingAnalyzer:
+    """Analyzer stub that counts direct analyze calls"""
+
+    batches = False
+    passthrough = False
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze(self, prompt, max_tokens, temperature, context):
+        self.calls += 1
+        return main.AnalysisResponse(response=f"{prompt} #{self.calls}")
+
+
+@pytest.fixture
+def counting_client(monkeypatch):
+    analyzer = _CountingAnalyzer()
+    monkeypatch.setattr(main, "model", analyzer)
+    monkeypatch.setattr(main, "response_cache", TTLCache(maxsize=16, ttl=60))
+    return analyzer, TestClient(main.app)
+
+
+def test_cache_serves_repeated_deterministic_requests(counting_client):
+    analyzer, client = counting_client
+    body = {"prompt": "x", "temperature": 0, "context": {"service": "api"}}
+
+    first = client.post("/analyze", json=body)
+    second = client.post("/analyze", json=body)
+    assert analyzer.calls == 1
+    assert first.json() == second.json()
+
+
+def test_cache_skips_sampled_requests(counting_client):
+    analyzer, client = counting_client
+    for _ in range(2):
+        assert client.post("/analyze", json={"prompt": "x", "temperature": 0.3}).status_code == 200
+    assert analyzer.calls == 2
+
+
+@pytest.mark.parametrize("change", [
+    {"max_tokens": 100},
+    {"context": {"service": "other"}},
+    {"prompt": "y"},
+])
+def test_cache_misses_when_request_differs(counting_client, change):
+    analyzer, client = counting_client
+    body = {"prompt": "x", "temperature": 0, "max_tokens": 500, "context": {"service": "api"}}
+
+    client.post("/analyze", json=body)
+    client.post("/analyze", json=body | change)
+    assert analyzer.calls == 2
+
+
+def test_cache_serves_requests_without_a_cache_key(counting_client):
+    analyzer, client = counting_client
+    # orjson cannot encode integers beyond 64 bits, so no cache key can be built
+    body = {"prompt": "x", "temperature": 0, "context": {"n": 2**70}}
+
+    for _ in range(2):
+        assert client.post("/analyze", json=body).status_code == 200
+    assert analyzer.calls == 2
+
+
+def _proxy_client(monkeypatch, handler):
+    analyzer = main.ProxyAnalyzer("http://upstream")
+    analyzer._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "model", analyzer)
+    # Not entered as a context manager, so startup does not replace the stub
+    return TestClient(main.app)
+
+
+def test_proxy_passes_upstream_body_through(monkeypatch):
+    body = b'{"response":"upstream","confidence":0.9,"anomalies":null,"suggestions":null,"metadata":null}'
+    client = _proxy_client(monkeypatch, lambda request: httpx.Response(200, content=body))
+
+    response = client.post("/analyze", json={"prompt": "x"})
+    assert response.status_code == 200
+    assert response.content == body
+
+
+def test_proxy_relays_upstream_error_status(monkeypatch):
+    client = _proxy_client(monkeypatch, lambda request: httpx.Response(502, text="bad gateway"))
+
+    response = client.post("/analyze", json={"prompt": "x"})
+    assert response.status_code == 502
+    assert response.json() == {"detail": "Grok API error: bad gateway"}
+
+
+def test_proxy_enforces_overall_deadline(monkeypatch):
+    async def slow_upstream(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, content=b"{}")
+
+    monkeypatch.setattr(main.ProxyAnalyzer, "timeout", 0.05)
+    client = _proxy_client(monkeypatch, slow_upstream)
+
+    response = client.post("/analyze", json={"prompt": "x"})
+    assert response.status_code == 504
+
+
+def test_proxy_forwards_context_orjson_cannot_encode(monkeypatch):
+    received = []
+
+    def upstream(request):
+        received.append(json.loads(request.content))
+        return httpx.Response(200, content=b'{"response":"ok"}')
+
+    client = _proxy_client(monkeypatch, upstream)
+
+    response = client.post("/analyze", json={"prompt": "x", "context": {"n": 2**70}})
+    assert response.status_code == 200
+    assert received[0]["context"] == {"n": 2**70}
+
+
+@pytest.mark.parametrize("context", [
+    {"service": "api", "anomalies": [{"score": 90}]},
+    {"anomalies": [{"anomaly_type": None, "score": "85"}]},
+    {"anomalies": "none"},
+])
+def test_proxy_forwards_context_as_sent(monkeypatch, context):
+    received = []
+
+    def upstream(request):
+        received.append(request.content)
+        return httpx.Response(200, content=b'{"response":"ok"}')
+
+    client = _proxy_client(monkeypatch, upstream)
+
+    response = client.post("/analyze", json={"prompt": "x", "context": context})
+    assert response.status_code == 200
+    assert orjson.loads(received[0])["context"] == context
+    # Key order and number types survive, not just the decoded values
+    assert b'"context":' + orjson.dumps(context) in received[0]
+
+
+def test_lightweight_rejects_invalid_context(monkeypatch):
+    monkeypatch.setattr(main, "model", main.LightweightAnalyzer())
+    client = TestClient(main.app)
+
+    response = client.post("/analyze", json={"prompt": "x", "context": {"anomalies": "none"}})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "context", "anomalies"]
+
+
+def test_lightweight_batch_fails_only_invalid_requests():
+    analyzer = main.LightweightAnalyzer()
+    contexts = [
+        {"anomalies": [{"anomaly_type": "ddos_attack", "severity": "critical", "score": 70}]},
+        {"anomalies": [{"score": None}]},
+        None,
+    ]
+    results = asyncio.run(analyzer.analyze_batch(["a", "b", "c"], [500] * 3, [0.3] * 3, contexts))
+
+    assert results[0].anomalies == ["Confirmed: ddos_attack - critical"]
+    assert isinstance(results[1], main.HTTPException) and results[1].status_code == 422
+    assert results[2].anomalies is None
+
+
+def test_lightweight_batch_recovers_from_dead_worker():
+    analyzer = main.LightweightAnalyzer(processes=1)
+    contexts = [{"anomalies": [{"anomaly_type": "error_spike", "severity": "high", "score": 90}]}]
+
+    async def run():
+        return await analyzer.analyze_batch(["a"], [500], [0.3], contexts)
+
+    try:
+        expected = asyncio.run(analyzer.analyze("a", 500, 0.3, contexts[0]))
+        assert asyncio.run(run())[0].anomalies == expected.anomalies
+
+        for process in list(analyzer._executor._processes.values()):
+            process.kill()
+            process.join()
+
+        with pytest.raises(main.HTTPException) as exc_info:
+            asyncio.run(run())
+        assert exc_info.value.status_code == 503
+
+        assert asyncio.run(run())[0].anomalies == expected.anomalies
+    finally:
+        asyncio.run(analyzer.close())
+
+
+@pytest.mark.parametrize("size", [3, main.VECTORIZE_THRESHOLD + 1])
+def test_scalar_and_vectorized_validation_agree(monkeypatch, size):
+    analyzer = main.LightweightAnalyzer()
+    scores = [float(i % 101) for i in range(size)]
+    type_ids = [i % len(main.AnomalyType) for i in range(size)]
+
+    expected = analyzer._validate_anomalies(scores, type_ids)
+    monkeypatch.setattr(main, "VECTORIZE_THRESHOLD", -1 if size <= 3 else 10**9)
+    assert analyzer._validate_anomalies(scores, type_ids) == expected